@@ -1,18 +1,240 @@
 import streamlit as st
+import atexit
+import base64
 import json
 import os
+import threading
 import time
-from datetime import datetime
+from collections import deque
 import numpy as np
 
+try:
+    import orjson  # serialização em C, ~5-10x mais rápida que json
+except ImportError:
+    orjson = None
+
+if orjson is not None:
+    _dumps = orjson.dumps
+    _loads = orjson.loads
+else:
+    def _dumps(obj):
+        return json.dumps(obj, separators=(',', ':'),
+                          ensure_ascii=False).encode('utf-8')
+    _loads = json.loads
+
+# Codificação compacta dos resultados: C=0, V=1, E=2 (1 byte por rodada)
+RESULT_CODES = {'C': 0, 'V': 1, 'E': 2}
+RESULT_CHARS = ('C', 'V', 'E')
+COLOR_NAMES = {'C': 'Vermelho', 'V': 'Azul', 'E': 'Empate'}
+EMOJI = {'C': '🔴', 'V': '🔵', 'E': '🟡'}
+EMOJIS = np.array(['🔴', '🔵', '🟡'])  # indexada pelo código int8
+PATTERN_TYPES = ('alternating', 'streak_end', '2x2')
+RISK_LEVELS = ('Baixo', 'Médio', 'Alto')
+VOLATILITY_LEVELS = ('Baixa', 'Média', 'Alta')
+
+# Recomendação pré-computada: _REC_TABLE[risco][volatilidade][confiança>65]
+# Regras: risco Alto ou volatilidade Alta => Evitar; Apostar exige risco
+# Baixo, volatilidade Baixa e confiança alta; o resto é Observar.
+_REC_TABLE = (
+    ((  'Observar', 'Apostar'), ('Observar', 'Observar'), ('Evitar', 'Evitar')),
+    ((  'Observar', 'Observar'), ('Observar', 'Observar'), ('Evitar', 'Evitar')),
+    ((  'Evitar', 'Evitar'), ('Evitar', 'Evitar'), ('Evitar', 'Evitar')),
+)
+
+# Janela compacta: últimas 27 rodadas em 2 bits cada (54 bits úteis)
+PACK_WINDOW = 27
+PACK_MASK = (1 << (2 * PACK_WINDOW)) - 1
+
+# Retenção em memória: a análise usa no máximo 90 rodadas e a UI mostra
+# 90 resultados / 5 sinais, então os buffers podem ser limitados.
+MAX_RESULTS = 256
+MAX_SIGNALS = 64
+ANALYSIS_WINDOW = 90
+
+# Análise neutra compartilhada (ninguém muta o dict de análise in place,
+# então histórico curto/vazio pode apontar para esta constante)
+_DEFAULT_ANALYSIS = {
+    'patterns': [],
+    'riskLevel': 'Baixo',
+    'volatility': 'Baixa',
+    'prediction': None,
+    'confidence': 0,
+    'recommendation': 'Observar'
+}
+
+# Persistência: snapshot completo + log de eventos append-only
+DATA_PATH = 'analyzer_data.json'
+EVENTS_PATH = 'analyzer_events.jsonl'
+SNAPSHOT_EVERY = 200
+
+# --- EMPACOTAMENTO PARA PERSISTÊNCIA (4 códigos de 2 bits por byte) ---
+def _pack_results(arr):
+    n = arr.size
+    padded = np.zeros(-(-n // 4) * 4, dtype=np.uint8)
+    padded[:n] = arr.view(np.uint8)
+    packed = (padded[0::4] << 6) | (padded[1::4] << 4) \
+        | (padded[2::4] << 2) | padded[3::4]
+    return packed.astype(np.uint8).tobytes()
+
+def _unpack_results(data, n):
+    b = np.frombuffer(data, dtype=np.uint8)
+    out = np.empty(b.size * 4, dtype=np.int8)
+    out[0::4] = (b >> 6) & 3
+    out[1::4] = (b >> 4) & 3
+    out[2::4] = (b >> 2) & 3
+    out[3::4] = b & 3
+    return np.ascontiguousarray(out[:n])
+
+def _ts_to_secs(ts):
+    h, m, sec = ts.split(':')
+    return int(h) * 3600 + int(m) * 60 + int(sec)
+
+def _secs_to_ts(v):
+    return '%02d:%02d:%02d' % (v // 3600, (v % 3600) // 60, v % 60)
+
+def _now_secs():
+    lt = time.localtime()
+    return lt.tm_hour * 3600 + lt.tm_min * 60 + lt.tm_sec
+
+def _build_patterns(results, alternating, streak_color, streak_length,
+                    two_by_two):
+    # Recebe os inteiros do kernel; os dicts de descrição são
+    # materializados aqui, uma vez por clique.
+    patterns = []
+    if alternating:
+        patterns.append({
+            'type': 'alternating',
+            'description': f'Padrão alternado (Ex: {RESULT_CHARS[results[-2]]} {RESULT_CHARS[results[-1]]}...)'
+        })
+
+    if streak_color >= 0:
+        streak_char = RESULT_CHARS[streak_color]
+        patterns.append({
+            'type': 'streak_end',
+            'color': streak_char,
+            'length': streak_length,
+            'description': f'Fim de Sequência: {streak_length}x {COLOR_NAMES[streak_char]}'
+        })
+
+    if two_by_two:
+        patterns.append({
+            'type': '2x2',
+            'description': 'Padrão 2x2 (Ex: CCVV)'
+        })
+
+    return patterns
+
+def _calculate_statistical_bias(size, c_count, v_count, e_count):
+    # Devolve o índice em RISK_LEVELS (0=Baixo, 1=Médio, 2=Alto)
+    if not size: return 0
+
+    total_non_tie = c_count + v_count
+
+    # Análise do desvio de empates
+    expected_e_ratio = 0.027  # Probabilidade teórica de empate
+    actual_e_ratio = e_count / size
+
+    if actual_e_ratio > expected_e_ratio * 3 or e_count >= 3:
+        return 2
+
+    # Análise do desvio entre C e V
+    if total_non_tie > 0:
+        c_ratio = c_count / total_non_tie
+        v_ratio = v_count / total_non_tie
+
+        if abs(c_ratio - 0.5) > 0.15 or abs(v_ratio - 0.5) > 0.15:
+            return 1
+
+    return 0
+
+def _assess_volatility(size, changes):
+    # Devolve o índice em VOLATILITY_LEVELS (0=Baixa, 1=Média, 2=Alta)
+    if size < 5: return 0
+
+    change_rate = changes / size
+
+    if change_rate < 0.2:
+        return 2 # Menos mudanças = sequências longas
+    if change_rate > 0.6:
+        return 0 # Muitas mudanças = alternância
+
+    return 1
+
+def _make_prediction(last_code, streak_code, patterns, scores):
+    """scores: {tipo: (hits, total, priority)} — instantâneo imutável do
+    aprendizado, vindo da chave do cache. Trabalha só com códigos int8;
+    o flip C<->V é (1 - codigo) & 1, que também mapeia E para V."""
+    # Padrão de maior prioridade
+    best_pattern_type = None
+    highest_priority = 0
+    for p in patterns:
+        priority = scores.get(p['type'], (0, 0, 1))[2]
+        if priority > highest_priority:
+            highest_priority = priority
+            best_pattern_type = p['type']
+
+    # Faz a previsão com base no padrão de maior prioridade
+    prediction = {'color': None, 'confidence': 0, 'pattern_type': None}
+    if best_pattern_type == 'alternating':
+        prediction['color'] = RESULT_CHARS[(1 - last_code) & 1]
+        prediction['pattern_type'] = 'alternating'
+    elif best_pattern_type == 'streak_end':
+        # Previsão: quebra da sequência
+        prediction['color'] = RESULT_CHARS[(1 - streak_code) & 1]
+        prediction['pattern_type'] = 'streak_end'
+    elif best_pattern_type == '2x2':
+        prediction['color'] = RESULT_CHARS[(1 - last_code) & 1]
+        prediction['pattern_type'] = '2x2'
+
+    if prediction['pattern_type']:
+        hits, total, _ = scores[prediction['pattern_type']]
+        if total > 0:
+            prediction['confidence'] = int((hits / total) * 100)
+        else:
+            prediction['confidence'] = 50
+
+    return prediction
+
+def _get_recommendation(risk_i, vol_i, confidence):
+    # Um índice na tabela pré-computada em vez de comparações de string
+    return _REC_TABLE[risk_i][vol_i][confidence > 65]
+
+@st.cache_data(max_entries=2048)
+def compute_analysis(results_key, streak_color, streak_length, alternating,
+                     two_by_two, counts_key, scores_key):
+    """Análise pura da janela recente. Todos os argumentos são hasháveis e
+    determinam o resultado, então reruns do Streamlit com o mesmo estado
+    saem direto do cache em vez de recomputar."""
+    recent = np.array(results_key, dtype=np.int8)
+
+    # Contagens e mudanças vêm do estado incremental do analisador
+    c_count, v_count, e_count, changes = counts_key
+
+    patterns = _build_patterns(recent, alternating, streak_color,
+                               streak_length, two_by_two)
+    risk_i = _calculate_statistical_bias(recent.size, c_count,
+                                         v_count, e_count)
+    vol_i = _assess_volatility(recent.size, changes)
+    prediction_result = _make_prediction(int(recent[-1]), streak_color, patterns,
+                                         dict(zip(PATTERN_TYPES, scores_key)))
+
+    return {
+        'patterns': patterns,
+        'riskLevel': RISK_LEVELS[risk_i],
+        'volatility': VOLATILITY_LEVELS[vol_i],
+        'prediction': prediction_result['color'],
+        'confidence': prediction_result['confidence'],
+        'recommendation': _get_recommendation(risk_i, vol_i,
+                                              prediction_result['confidence'])
+    }
+
 class PredictiveAnalyzer:
     def __init__(self):
-        self.emoji_map = {'C': '🔴', 'V': '🔵', 'E': '🟡'}
-        self.color_names = {'C': 'Vermelho', 'V': 'Azul', 'E': 'Empate'}
-        
         # --- Dados persistentes ---
-        self.history = []
-        self.signals = []
+        # Histórico em layout de arrays paralelos: códigos int8 + timestamps
+        self.results = np.empty(0, dtype=np.int8)
+        self.timestamps = []
+        self.signals = deque(maxlen=MAX_SIGNALS)
         self.performance = {'total': 0, 'hits': 0, 'misses': 0}
         self.pattern_scores = {
             'alternating': {'hits': 0, 'total': 0, 'priority': 3},
@@ -21,48 +243,235 @@ class PredictiveAnalyzer:
         }
         
         # --- Análise atual ---
-        self.analysis = {
-            'patterns': [],
-            'riskLevel': 'Baixo',
-            'volatility': 'Baixa',
-            'prediction': None,
-            'confidence': 0,
-            'recommendation': 'Observar'
-        }
+        self.analysis = _DEFAULT_ANALYSIS
         
+        # Chave do último estado analisado (memoização barata)
+        self._last_analysis_key = None
+
+        # As prioridades só precisam de recálculo quando o aprendizado
+        # (ou um reset) mexe em pattern_scores
+        self._priorities_dirty = True
+
+        # --- Controle de gravação ---
+        # O caso comum é O(1): cada clique vira uma linha no log de
+        # eventos; o snapshot completo só é regravado periodicamente.
+        self._dirty = False
+        self._log = None
+        self._replaying = False
+        self._events_since_snapshot = 0
+
+        # O analisador é compartilhado entre sessões (st.cache_resource);
+        # as mutações precisam ser serializadas.
+        self._lock = threading.Lock()
+
         self.load_data()
+        self._rebuild_streak_state()
+        self._rebuild_window()
+        self._rebuild_packed()
+        self._pending_signal_idx = self._find_pending_signal()
+        self._replay_events()
+        self._log = open(EVENTS_PATH, 'ab', buffering=1 << 16)
+        atexit.register(self._shutdown)
+
+    def _rebuild_window(self):
+        # Reconstrói os contadores da janela de análise (carregamento,
+        # desfazer e limpar); nos cliques a atualização é O(1).
+        window = self.results[-ANALYSIS_WINDOW:]
+        self._window = deque(window.tolist(), maxlen=ANALYSIS_WINDOW)
+        counts = np.bincount(window, minlength=3)
+        self._counts = [int(counts[0]), int(counts[1]), int(counts[2])]
+        self._changes = int(np.count_nonzero(window[1:] != window[:-1]))
+
+    def _window_append(self, code):
+        # Mantém contagens e nº de mudanças da janela deslizante em O(1)
+        window = self._window
+        if len(window) == window.maxlen:
+            evicted = window[0]
+            self._counts[evicted] -= 1
+            if window[1] != evicted:
+                self._changes -= 1
+        if window and window[-1] != code:
+            self._changes += 1
+        window.append(code)
+        self._counts[code] += 1
+
+    def _rebuild_packed(self):
+        # Reempacota a cauda em 2 bits por rodada (carregamento/desfazer)
+        packed = 0
+        for code in self.results[-PACK_WINDOW:]:
+            packed = (packed << 2) | int(code)
+        self._packed = packed
+
+    def _find_pending_signal(self):
+        # Usado só no carregamento; nos cliques o ponteiro é mantido em O(1)
+        for i in reversed(range(len(self.signals))):
+            if self.signals[i].get('correct') is None:
+                return i
+        return None
+
+    def _rebuild_streak_state(self):
+        """Recalcula as sequências corrente e anterior a partir do array.
+        Usado no carregamento, no desfazer e no limpar; nos cliques normais
+        o estado é atualizado em O(1) por add_outcome."""
+        self._cur_streak_color = -1
+        self._cur_streak_len = 0
+        self._prev_streak_color = -1
+        self._prev_streak_len = 0
+
+        arr = self.results
+        i = arr.size - 1
+        if i < 0:
+            return
+        cur = int(arr[i])
+        length = 1
+        while i > 0 and arr[i-1] == cur:
+            length += 1
+            i -= 1
+        self._cur_streak_color = cur
+        self._cur_streak_len = length
+        if i > 0:
+            j = i - 1
+            prev = int(arr[j])
+            prev_length = 1
+            while j > 0 and arr[j-1] == prev:
+                prev_length += 1
+                j -= 1
+            self._prev_streak_color = prev
+            self._prev_streak_len = prev_length
 
     # --- MÉTODOS DE GERENCIAMENTO DE DADOS PERSISTENTES ---
     def load_data(self):
-        if os.path.exists('analyzer_data.json'):
-            with open('analyzer_data.json', 'r') as f:
+        if os.path.exists(DATA_PATH):
+            with open(DATA_PATH, 'rb') as f:
                 try:
-                    data = json.load(f)
-                    self.history = data.get('history', [])
-                    self.signals = data.get('signals', [])
+                    data = _loads(f.read())
+                    if 'packed' in data:
+                        self.results = _unpack_results(
+                            base64.b64decode(data['packed']), data.get('n', 0))
+                        self.timestamps = list(data.get('timestamps', []))
+                    elif 'history' in data:
+                        # Formato antigo: lista de dicts {'result','timestamp'}
+                        self.results = np.array(
+                            [RESULT_CODES[d['result']] for d in data['history']],
+                            dtype=np.int8)
+                        self.timestamps = [_ts_to_secs(d['timestamp'])
+                                           for d in data['history']]
+                    else:
+                        # Formato intermediário: lista de códigos int
+                        self.results = np.array(data.get('results', []), dtype=np.int8)
+                        self.timestamps = [
+                            _ts_to_secs(v) if isinstance(v, str) else v
+                            for v in data.get('timestamps', [])]
+                    signals = data.get('signals', [])
+                    for sig in signals:
+                        if isinstance(sig.get('time'), str):
+                            sig['time'] = _ts_to_secs(sig['time'])
+                    self.signals = deque(signals, maxlen=MAX_SIGNALS)
                     self.performance = data.get('performance', {'total': 0, 'hits': 0, 'misses': 0})
                     self.pattern_scores = data.get('pattern_scores', self.pattern_scores)
-                except json.JSONDecodeError:
+                except ValueError:
                     st.warning("Arquivo de dados corrompido. Reiniciando o histórico.")
                     self.clear_history()
     
-    def save_data(self):
+    def _log_event(self, event):
+        # Uma linha por mutação; o snapshot periódico trunca o log
+        self._dirty = True
+        if self._replaying or self._log is None:
+            return
+        self._log.write(_dumps(event) + b'\n')
+        self._events_since_snapshot += 1
+        if self._events_since_snapshot >= SNAPSHOT_EVERY:
+            self._flush()
+
+    def _replay_events(self):
+        # Reaplica os eventos gravados depois do último snapshot
+        if not os.path.exists(EVENTS_PATH):
+            return
+        self._replaying = True
+        try:
+            with open(EVENTS_PATH, 'rb') as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        event = _loads(line)
+                    except ValueError:
+                        break  # linha final truncada: ignora o resto
+                    op = event.get('op')
+                    if op == 'add':
+                        self._add_outcome(RESULT_CHARS[event['r']],
+                                          event['t'])
+                    elif op == 'undo':
+                        self._undo_last()
+                    elif op == 'clear':
+                        self._clear_history()
+        finally:
+            self._replaying = False
+
+    def _flush(self, fsync=False):
+        if not self._dirty:
+            return
         data = {
-            'history': self.history,
-            'signals': self.signals,
+            'n': int(self.results.size),
+            'packed': base64.b64encode(_pack_results(self.results)).decode('ascii'),
+            'timestamps': list(self.timestamps),
+            'signals': list(self.signals),
             'performance': self.performance,
             'pattern_scores': self.pattern_scores
         }
-        with open('analyzer_data.json', 'w') as f:
-            json.dump(data, f, indent=4)
-    
+        # Grava em arquivo temporário e renomeia para manter atomicidade
+        with open('analyzer_data.json.tmp', 'wb') as f:
+            f.write(_dumps(data))
+            if fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace('analyzer_data.json.tmp', 'analyzer_data.json')
+
+        # O snapshot substitui o log: trunca para recomeçar do zero
+        if self._log is not None:
+            self._log.close()
+            self._log = open(EVENTS_PATH, 'wb', buffering=1 << 16)
+        elif os.path.exists(EVENTS_PATH):
+            os.remove(EVENTS_PATH)
+        self._events_since_snapshot = 0
+        self._dirty = False
+
+    def _shutdown(self):
+        # Fim de sessão: grava o snapshot final com fsync explícito.
+        # Durante a sessão as gravações ficam no buffer de usuário (log
+        # com buffering de 64 KiB, snapshots sem fsync) — um fsync por
+        # clique viraria o gargalo do caminho de gravação.
+        self._flush(fsync=True)
+
     # --- MÉTODOS DE AÇÃO DO USUÁRIO ---
     def add_outcome(self, outcome):
+        with self._lock:
+            self._add_outcome(outcome)
+
+    def _add_outcome(self, outcome, timestamp=None):
         # 1. Verifica a previsão da rodada anterior antes de adicionar o novo resultado
         self.verify_previous_prediction(outcome)
-        
-        timestamp = datetime.now().strftime("%H:%M:%S")
-        self.history.append({'result': outcome, 'timestamp': timestamp})
+
+        if timestamp is None:
+            timestamp = _now_secs()
+        code = RESULT_CODES[outcome]
+        self.results = np.append(self.results, np.int8(code))
+        self.timestamps.append(timestamp)
+        if self.results.size > MAX_RESULTS:
+            self.results = self.results[-MAX_RESULTS:]
+            del self.timestamps[:-MAX_RESULTS]
+
+        # Atualização O(1) da janela, da palavra compacta e das sequências
+        self._window_append(code)
+        self._packed = ((self._packed << 2) | code) & PACK_MASK
+        if code == self._cur_streak_color:
+            self._cur_streak_len += 1
+        else:
+            self._prev_streak_color = self._cur_streak_color
+            self._prev_streak_len = self._cur_streak_len
+            self._cur_streak_color = code
+            self._cur_streak_len = 1
         
         # 2. Reanalisa os dados e gera a nova previsão para a próxima rodada
         self.analyze_data()
@@ -72,238 +481,172 @@ class PredictiveAnalyzer:
             self.signals.append({
                 'time': timestamp,
                 'patterns': self.analysis['patterns'],
+                # Tipos pré-extraídos: o aprendizado não revisita os dicts
+                'pattern_types': [p['type'] for p in self.analysis['patterns']],
                 'prediction': self.analysis['prediction'],
                 'correct': None,
                 'confidence': self.analysis['confidence']
             })
+            self._pending_signal_idx = len(self.signals) - 1
+
+        self._log_event({'op': 'add', 'r': code, 't': timestamp})
 
-        self.save_data()
+    def replay(self, outcomes):
+        """Reinsere um lote de resultados de uma vez (códigos int8 ou
+        letras C/V/E), com uma única gravação ao final — útil para repor
+        um log exportado ou alimentar testes."""
+        with self._lock:
+            for outcome in outcomes:
+                if not isinstance(outcome, str):
+                    outcome = RESULT_CHARS[int(outcome)]
+                self._add_outcome(outcome)
+            self._flush()
 
     def undo_last(self):
-        if self.history:
+        with self._lock:
+            return self._undo_last()
+
+    def _undo_last(self):
+        if self.results.size:
             # Reverte a pontuação se a última jogada tiver uma previsão pendente
             if self.signals and self.signals[-1].get('correct') is None:
                 self.signals.pop()
-            
+                self._pending_signal_idx = None
+
             # Remove o último resultado do histórico
-            self.history.pop()
+            self.results = self.results[:-1]
+            self.timestamps.pop()
+            self._rebuild_streak_state()
+            self._rebuild_window()
+            self._rebuild_packed()
+            self._last_analysis_key = None
 
             # Recalcula a análise
-            if self.history:
+            if self.results.size:
                 self.analyze_data()
             else:
-                self.analysis = {
-                    'patterns': [], 'riskLevel': 'Baixo', 'volatility': 'Baixa',
-                    'prediction': None, 'confidence': 0, 'recommendation': 'Observar'
-                }
+                self.analysis = _DEFAULT_ANALYSIS
                 
-            self.save_data()
+            self._log_event({'op': 'undo'})
             return True
         return False
         
     def clear_history(self):
-        self.history = []
-        self.signals = []
+        with self._lock:
+            self._clear_history()
+
+    def _clear_history(self):
+        self.results = np.empty(0, dtype=np.int8)
+        self.timestamps = []
+        self.signals = deque(maxlen=MAX_SIGNALS)
         self.performance = {'total': 0, 'hits': 0, 'misses': 0}
         self.pattern_scores = {
             'alternating': {'hits': 0, 'total': 0, 'priority': 3},
             'streak_end': {'hits': 0, 'total': 0, 'priority': 2},
             '2x2': {'hits': 0, 'total': 0, 'priority': 1}
         }
-        self.analysis = {
-            'patterns': [], 'riskLevel': 'Baixo', 'volatility': 'Baixa',
-            'prediction': None, 'confidence': 0, 'recommendation': 'Observar'
-        }
-        self.save_data()
+        self.analysis = _DEFAULT_ANALYSIS
+        self._rebuild_streak_state()
+        self._rebuild_window()
+        self._rebuild_packed()
+        self._last_analysis_key = None
+        self._priorities_dirty = True
+        self._pending_signal_idx = None
+        # Limpar é destrutivo: grava o snapshot (e trunca o log) na hora
+        self._dirty = True
+        self._flush()
     
     # --- MÉTODOS DE ANÁLISE E APRENDIZADO DA IA ---
     def analyze_data(self):
-        data = self.history
-        if len(data) < 3:
-            self.analysis = {
-                'patterns': [], 'riskLevel': 'Baixo', 'volatility': 'Baixa',
-                'prediction': None, 'confidence': 0, 'recommendation': 'Observar'
-            }
+        if self.results.size < 3:
+            self.analysis = _DEFAULT_ANALYSIS
             return
 
-        recent_data = data[-90:]
-        
-        patterns = self.detect_patterns(recent_data)
-        risk_level = self._calculate_statistical_bias(recent_data)
-        volatility = self._assess_volatility(recent_data)
-        prediction_result = self.make_prediction(recent_data, patterns)
-        
-        self.analysis = {
-            'patterns': patterns,
-            'riskLevel': risk_level,
-            'volatility': volatility,
-            'prediction': prediction_result['color'],
-            'confidence': prediction_result['confidence'],
-            'recommendation': self.get_recommendation(risk_level, volatility, prediction_result['confidence'])
-        }
+        # O ajuste de prioridades é efeito colateral do aprendizado e
+        # precisa acontecer antes de montar a chave do cache; fora de um
+        # evento de aprendizado os scores não mudam e o passo é pulado.
+        if self._priorities_dirty:
+            self._refresh_priorities()
+            self._priorities_dirty = False
+
+        # A janela-espelho em deque evita fatiar o array a cada clique
+        n = len(self._window)
+
+        # Padrões de cauda por máscara de bits sobre a palavra compacta
+        packed = self._packed
+        alternating = 1 if (packed & 3) != ((packed >> 2) & 3) else 0
+        two_by_two = 0
+        if n >= 4 and ((packed >> 6) & 3) == ((packed >> 4) & 3) \
+                and ((packed >> 2) & 3) == (packed & 3) \
+                and ((packed >> 6) & 3) != (packed & 3):
+            two_by_two = 1
+
+        # A sequência encerrada vem do estado incremental (O(1)); o
+        # comprimento reportado inclui o próprio elemento em -2, como na
+        # varredura original.
+        streak_color = -1
+        streak_length = 0
+        if alternating and self._prev_streak_len >= 1:
+            streak_color = self._prev_streak_color
+            streak_length = min(self._prev_streak_len, n - 1) + 1
+
+        counts_key = (self._counts[0], self._counts[1], self._counts[2],
+                      self._changes)
+        scores_key = tuple((self.pattern_scores[t]['hits'],
+                            self.pattern_scores[t]['total'],
+                            self.pattern_scores[t]['priority'])
+                           for t in PATTERN_TYPES)
+
+        # Nada mudou desde a última análise: mantém o resultado corrente
+        key = (self._packed, self.results.size, streak_color, streak_length,
+               counts_key, scores_key)
+        if key == self._last_analysis_key:
+            return
 
-    def detect_patterns(self, data):
-        patterns = []
-        results = [d['result'] for d in data]
+        self.analysis = compute_analysis(tuple(self._window), streak_color,
+                                         streak_length, alternating,
+                                         two_by_two, counts_key, scores_key)
+        self._last_analysis_key = key
 
-        # Padrão: Alternância
-        if len(results) >= 2 and results[-1] != results[-2] and len(set(results[-2:])) == 2:
-            patterns.append({
-                'type': 'alternating',
-                'description': f'Padrão alternado (Ex: {results[-2]} {results[-1]}...)'
-            })
-        
-        # Padrão: Fim de Sequência
-        if len(results) >= 2 and results[-1] != results[-2]:
-            streak_length = 1
-            for i in range(len(results) - 2, -1, -1):
-                if results[i] == results[-2]:
-                    streak_length += 1
-                else:
-                    break
-            if streak_length >= 2:
-                patterns.append({
-                    'type': 'streak_end',
-                    'color': results[-2],
-                    'length': streak_length,
-                    'description': f'Fim de Sequência: {streak_length}x {self.color_names[results[-2]]}'
-                })
-
-        # Padrão: 2x2
-        if len(results) >= 4:
-            last4 = results[-4:]
-            if last4[0] == last4[1] and last4[2] == last4[3] and last4[0] != last4[2]:
-                patterns.append({
-                    'type': '2x2',
-                    'description': 'Padrão 2x2 (Ex: CCVV)'
-                })
-
-        return patterns
-
-    def _calculate_statistical_bias(self, data):
-        results = [d['result'] for d in data]
-        if not results: return 'Baixo'
-        
-        c_count = results.count('C')
-        v_count = results.count('V')
-        e_count = results.count('E')
-        
-        total_non_tie = c_count + v_count
-        
-        # Análise do desvio de empates
-        expected_e_ratio = 0.027  # Probabilidade teórica de empate
-        actual_e_ratio = e_count / len(results)
-        
-        if actual_e_ratio > expected_e_ratio * 3 or e_count >= 3:
-            return 'Alto'
-
-        # Análise do desvio entre C e V
-        if total_non_tie > 0:
-            c_ratio = c_count / total_non_tie
-            v_ratio = v_count / total_non_tie
-            
-            if abs(c_ratio - 0.5) > 0.15 or abs(v_ratio - 0.5) > 0.15:
-                 return 'Médio'
-                 
-        return 'Baixo'
-
-    def _assess_volatility(self, data):
-        results = [d['result'] for d in data]
-        if len(results) < 5: return 'Baixa'
-        
-        # Contagem de mudanças de cor
-        changes = 0
-        for i in range(1, len(results)):
-            if results[i] != results[i-1]:
-                changes += 1
-        
-        change_rate = changes / len(results)
-        
-        if change_rate < 0.2:
-            return 'Alta' # Menos mudanças = sequências longas
-        if change_rate > 0.6:
-            return 'Baixa' # Muitas mudanças = alternância
-        
-        return 'Média'
-
-    def make_prediction(self, data, patterns):
-        results = [d['result'] for d in data]
-        last_result = results[-1]
-        
-        # Padrão de maior prioridade
-        best_pattern_type = None
-        highest_priority = 0
-        
+    def _refresh_priorities(self):
         # Ajusta prioridade com base na taxa de acerto do aprendizado
         for p_type, scores in self.pattern_scores.items():
             if scores['total'] > 5 and scores['hits'] / scores['total'] > 0.5:
                 scores['priority'] = int(min(5, (scores['hits'] / scores['total']) * 5))
             else:
                 scores['priority'] = max(1, scores['priority'] - 1)
-        
-        for p in patterns:
-            p_type = p['type']
-            priority = self.pattern_scores.get(p_type, {}).get('priority', 1)
-            
-            if priority > highest_priority:
-                highest_priority = priority
-                best_pattern_type = p_type
-                
-        # Faz a previsão com base no padrão de maior prioridade
-        prediction = {'color': None, 'confidence': 0, 'pattern_type': None}
-        if best_pattern_type == 'alternating':
-            prediction['color'] = 'C' if last_result == 'V' else 'V'
-            prediction['pattern_type'] = 'alternating'
-        elif best_pattern_type == 'streak_end':
-            # Previsão: quebra da sequência
-            streak_color = [p['color'] for p in patterns if p['type'] == 'streak_end'][0]
-            prediction['color'] = 'C' if streak_color == 'V' else 'V'
-            prediction['pattern_type'] = 'streak_end'
-        elif best_pattern_type == '2x2':
-            prediction['color'] = 'C' if last_result == 'V' else 'V'
-            prediction['pattern_type'] = '2x2'
-        
-        if prediction['pattern_type']:
-            p_type = prediction['pattern_type']
-            scores = self.pattern_scores[p_type]
-            if scores['total'] > 0:
-                prediction['confidence'] = int((scores['hits'] / scores['total']) * 100)
-            else:
-                prediction['confidence'] = 50
-        
-        return prediction
-
-    def get_recommendation(self, risk, volatility, confidence):
-        if risk == 'Alto' or volatility == 'Alta':
-            return 'Evitar'
-        if confidence > 65 and risk == 'Baixo' and volatility == 'Baixa':
-            return 'Apostar'
-        return 'Observar'
 
     def verify_previous_prediction(self, current_outcome):
-        for i in reversed(range(len(self.signals))):
-            signal = self.signals[i]
-            if signal.get('correct') is None:
-                self.performance['total'] += 1
-                
-                # Aplica o aprendizado adaptativo
-                if signal['prediction'] == current_outcome:
-                    self.performance['hits'] += 1
-                    signal['correct'] = "✅"
-                    self._update_learning_score(signal, was_correct=True)
-                else:
-                    self.performance['misses'] += 1
-                    signal['correct'] = "❌"
-                    self._update_learning_score(signal, was_correct=False)
-                return
+        # O ponteiro evita a varredura reversa da lista de sinais
+        idx = self._pending_signal_idx
+        if idx is None:
+            return
+        signal = self.signals[idx]
+        self._pending_signal_idx = None
+        self.performance['total'] += 1
+
+        # Aplica o aprendizado adaptativo
+        if signal['prediction'] == current_outcome:
+            self.performance['hits'] += 1
+            signal['correct'] = "✅"
+            self._update_learning_score(signal, was_correct=True)
+        else:
+            self.performance['misses'] += 1
+            signal['correct'] = "❌"
+            self._update_learning_score(signal, was_correct=False)
 
     def _update_learning_score(self, signal, was_correct):
-        for p in signal['patterns']:
-            p_type = p['type']
-            if p_type in self.pattern_scores:
-                self.pattern_scores[p_type]['total'] += 1
+        # Sinais antigos (pré pattern_types) caem no caminho via dicts
+        p_types = signal.get('pattern_types')
+        if p_types is None:
+            p_types = [p['type'] for p in signal['patterns']]
+        for p_type in p_types:
+            scores = self.pattern_scores.get(p_type)
+            if scores is not None:
+                scores['total'] += 1
                 if was_correct:
-                    self.pattern_scores[p_type]['hits'] += 1
+                    scores['hits'] += 1
+                self._priorities_dirty = True
 
     def get_accuracy(self):
         if self.performance['total'] == 0:
@@ -311,41 +654,136 @@ class PredictiveAnalyzer:
         return (self.performance['hits'] / self.performance['total']) * 100
 
 # --- INTERFACE DO USUÁRIO STREAMLIT ---
+# CSS estático do cartão de previsão: montado uma vez no import e emitido
+# em bloco, deixando o markdown dinâmico por rerun com só a div pequena.
+_PRED_CARD_CSS = """<style>
+.pred {
+    border-radius: 15px;
+    padding: 20px;
+    margin: 20px 0;
+    display: flex;
+    flex-direction: column;
+    align-items: center;
+    justify-content: center;
+    box-shadow: 0 6px 12px rgba(0,0,0,0.2);
+    border: 2px solid #fff;
+}
+.pred-C { background: rgba(255, 0, 0, 0.2); }
+.pred-V { background: rgba(0, 0, 255, 0.2); }
+.pred-E { background: rgba(255, 255, 0, 0.2); }
+.pred-title { font-size: 20px; font-weight: bold; margin-bottom: 10px; }
+.pred-value { font-size: 40px; font-weight: bold; color: #fff; text-shadow: 2px 2px 4px rgba(0,0,0,0.5); }
+.pred-conf { font-size: 24px; margin-top: 10px; }
+</style>"""
+
 st.set_page_config(page_title="Sistema de Análise Preditiva - IA Avançada", layout="wide", page_icon="🎰")
 st.title("🎰 Sistema de Análise Preditiva - Cassino")
+# Modelos de cartão pré-compilados: por rerun só roda o .format
+_PRED_CARD_TMPL = """
+    <div class="pred pred-{pred}">
+        <div class="pred-title">Sugestão para a Próxima Rodada:</div>
+        <div class="pred-value">{display}</div>
+        <div class="pred-conf">Confiança: {confidence}%</div>
+    </div>
+    """
+
+_SIGNAL_CARD_TMPL = """
+        <div style="
+            background: {bg};
+            border-radius: 10px;
+            padding: 12px;
+            margin: 10px 0;
+            display: flex;
+            justify-content: space-between;
+            align-items: center;
+            box-shadow: 0 4px 8px rgba(0,0,0,0.1);
+        ">
+            <div>
+                <strong>Sinal para aposta em:</strong><br>
+                <small>{time}</small>
+            </div>
+            <div style="font-size: 24px; font-weight: bold;">{display}</div>
+            <div style="font-size: 16px;">Confiança: {confidence}%</div>
+            <div style="color: {color}; 
+                         font-weight: bold; font-size: 24px;">
+                {status}
+            </div>
+        </div>
+        {patterns_html}
+        """
+
+@st.cache_data(max_entries=64)
+def _render_history_html(codes_key):
+    # A grade de emojis só depende dos códigos visíveis; reruns sem clique
+    # novo reaproveitam o HTML pronto em vez de remontar as strings.
+    emoji_history = EMOJIS[np.frombuffer(codes_key, dtype=np.int8)[::-1]]
+    lines = [" ".join(emoji_history[i:i+9])
+             for i in range(0, emoji_history.size, 9)]
+    return "".join(f"<div style='font-size: 24px;'>**{line}**</div>"
+                   for line in lines)
+
+@st.cache_data(max_entries=64)
+def _render_signal_cards(signals_key):
+    # signals_key: tupla de (time, prediction, status, confidence,
+    # descrições) dos sinais visíveis — hashável, então o bloco inteiro
+    # só é remontado quando um sinal muda.
+    status_bg = {"✅": "rgba(0, 255, 0, 0.1)", "❌": "rgba(255, 0, 0, 0.1)"}
+    status_color = {"✅": "green", "❌": "red"}
+
+    cards = []
+    for time_s, prediction, status, confidence, descriptions in signals_key:
+        display = EMOJI[prediction] + " " + COLOR_NAMES[prediction]
+
+        patterns_html = ""
+        if descriptions:
+            patterns_info = " | ".join(descriptions)
+            patterns_html = f"<div style='font-size: 12px; color: gray; margin: -6px 0 10px 4px;'>Padrões: {patterns_info}</div>"
+
+        cards.append(_SIGNAL_CARD_TMPL.format(
+            bg=status_bg.get(status, "rgba(128, 128, 128, 0.1)"),
+            time=_secs_to_ts(time_s),
+            display=display,
+            confidence=confidence,
+            color=status_color.get(status, 'gray'),
+            status=status,
+            patterns_html=patterns_html))
+
+    return "".join(cards)
+
+st.markdown(_PRED_CARD_CSS, unsafe_allow_html=True)
 st.markdown("---")
 
-if 'analyzer' not in st.session_state:
-    st.session_state.analyzer = PredictiveAnalyzer()
+@st.cache_resource
+def get_analyzer():
+    # Uma única instância por processo: o JSON é lido uma vez e o estado
+    # passa a ser compartilhado entre as sessões/abas.
+    return PredictiveAnalyzer()
 
-analyzer = st.session_state.analyzer
+analyzer = get_analyzer()
 
 # SEÇÃO DE ENTRADA DE DADOS E CONTROLES
 st.subheader("Entrada de Resultados")
+# Os callbacks rodam antes da renderização, então um único ciclo de
+# script já mostra o estado novo — sem st.rerun() extra.
 col1, col2, col3 = st.columns(3)
 with col1:
-    if st.button("🔴 Vermelho (C)", use_container_width=True, type="primary"):
-        analyzer.add_outcome('C')
-        st.rerun()
+    st.button("🔴 Vermelho (C)", use_container_width=True, type="primary",
+              on_click=analyzer.add_outcome, args=('C',))
 with col2:
-    if st.button("🔵 Azul (V)", use_container_width=True, type="primary"):
-        analyzer.add_outcome('V')
-        st.rerun()
+    st.button("🔵 Azul (V)", use_container_width=True, type="primary",
+              on_click=analyzer.add_outcome, args=('V',))
 with col3:
-    if st.button("🟡 Empate (E)", use_container_width=True, type="primary"):
-        analyzer.add_outcome('E')
-        st.rerun()
+    st.button("🟡 Empate (E)", use_container_width=True, type="primary",
+              on_click=analyzer.add_outcome, args=('E',))
 
 st.markdown("<br>", unsafe_allow_html=True)
 cols_controls = st.columns(2)
 with cols_controls[0]:
-    if st.button("↩️ Desfazer Último", use_container_width=True, type="secondary"):
-        analyzer.undo_last()
-        st.rerun()
+    st.button("↩️ Desfazer Último", use_container_width=True, type="secondary",
+              on_click=analyzer.undo_last)
 with cols_controls[1]:
-    if st.button("🗑️ Limpar Tudo", use_container_width=True, type="secondary"):
-        analyzer.clear_history()
-        st.rerun()
+    st.button("🗑️ Limpar Tudo", use_container_width=True, type="secondary",
+              on_click=analyzer.clear_history)
 
 st.markdown("---")
 
@@ -354,36 +792,17 @@ st.subheader("📈 Análise Atual")
 analysis = analyzer.analysis
 
 if analysis['prediction']:
-    display_prediction = analyzer.emoji_map.get(analysis['prediction']) + " " + analyzer.color_names.get(analysis['prediction'], "...")
-    bg_color_prediction = ""
-    if analysis['prediction'] == 'C': bg_color_prediction = "rgba(255, 0, 0, 0.2)"
-    elif analysis['prediction'] == 'V': bg_color_prediction = "rgba(0, 0, 255, 0.2)"
-    else: bg_color_prediction = "rgba(255, 255, 0, 0.2)"
-
-    st.markdown(f"""
-    <div style="
-        background: {bg_color_prediction};
-        border-radius: 15px;
-        padding: 20px;
-        margin: 20px 0;
-        display: flex;
-        flex-direction: column;
-        align-items: center;
-        justify-content: center;
-        box-shadow: 0 6px 12px rgba(0,0,0,0.2);
-        border: 2px solid #fff;
-    ">
-        <div style="font-size: 20px; font-weight: bold; margin-bottom: 10px;">
-            Sugestão para a Próxima Rodada:
-        </div>
-        <div style="font-size: 40px; font-weight: bold; color: #fff; text-shadow: 2px 2px 4px rgba(0,0,0,0.5);">
-            {display_prediction}
-        </div>
-        <div style="font-size: 24px; margin-top: 10px;">
-            Confiança: {analysis['confidence']}%
-        </div>
-    </div>
-    """, unsafe_allow_html=True)
+    # O cartão só muda quando previsão/confiança mudam; reruns ociosos
+    # reaproveitam o HTML formatado guardado na sessão.
+    pred_key = (analysis['prediction'], analysis['confidence'])
+    if st.session_state.get('_pred_html_key') != pred_key:
+        display_prediction = EMOJI[analysis['prediction']] + " " + COLOR_NAMES[analysis['prediction']]
+        st.session_state['_pred_html'] = _PRED_CARD_TMPL.format(
+            pred=analysis['prediction'],
+            display=display_prediction,
+            confidence=analysis['confidence'])
+        st.session_state['_pred_html_key'] = pred_key
+    st.markdown(st.session_state['_pred_html'], unsafe_allow_html=True)
     
     st.write(f"**Recomendação:** {analysis['recommendation']}")
     st.write(f"**Nível de Risco Estatístico:** {analysis['riskLevel']}")
@@ -422,18 +841,11 @@ if analyzer.performance['total'] > 0:
 st.markdown("---")
 
 st.subheader("🎲 Histórico de Resultados")
-if analyzer.history:
+if analyzer.results.size:
     max_results = 90
-    recent_history = analyzer.history[-max_results:][::-1]
-    
-    lines = []
-    for i in range(0, len(recent_history), 9):
-        row = recent_history[i:i+9]
-        emojis = [analyzer.emoji_map[r['result']] for r in row]
-        lines.append(" ".join(emojis))
-    
-    for line in lines:
-        st.markdown(f"<div style='font-size: 24px;'>**{line}**</div>", unsafe_allow_html=True)
+    # Uma única emissão de markdown, com o HTML cacheado pelos códigos
+    st.markdown(_render_history_html(analyzer.results[-max_results:].tobytes()),
+                unsafe_allow_html=True)
 else:
     st.info("Nenhum resultado inserido ainda.")
 
@@ -441,39 +853,14 @@ st.markdown("---")
 
 st.subheader("📑 Últimas Sugestões Geradas")
 if analyzer.signals:
-    for signal in analyzer.signals[-5:][::-1]:
-        display = analyzer.emoji_map.get(signal['prediction']) + " " + analyzer.color_names.get(signal['prediction'], "...")
-        status = signal.get('correct', '...')
-        confidence = signal.get('confidence', 0)
-        bg_color = "rgba(0, 255, 0, 0.1)" if status == "✅" else "rgba(255, 0, 0, 0.1)" if status == "❌" else "rgba(128, 128, 128, 0.1)"
-        
-        st.markdown(f"""
-        <div style="
-            background: {bg_color};
-            border-radius: 10px;
-            padding: 12px;
-            margin: 10px 0;
-            display: flex;
-            justify-content: space-between;
-            align-items: center;
-            box-shadow: 0 4px 8px rgba(0,0,0,0.1);
-        ">
-            <div>
-                <strong>Sinal para aposta em:</strong><br>
-                <small>{signal['time']}</small>
-            </div>
-            <div style="font-size: 24px; font-weight: bold;">{display}</div>
-            <div style="font-size: 16px;">Confiança: {confidence}%</div>
-            <div style="color: {'green' if status == '✅' else 'red' if status == '❌' else 'gray'}; 
-                         font-weight: bold; font-size: 24px;">
-                {status}
-            </div>
-        </div>
-        """, unsafe_allow_html=True)
-        
-        if 'patterns' in signal and signal['patterns']:
-            patterns_info = " | ".join([p['description'] for p in signal['patterns']])
-            st.caption(f"Padrões: {patterns_info}")
+    signals_key = tuple(
+        (signal['time'], signal['prediction'], signal.get('correct', '...'),
+         signal.get('confidence', 0),
+         tuple(p['description'] for p in signal.get('patterns') or ()))
+        for signal in list(analyzer.signals)[-5:][::-1])
+
+    # Todos os cartões em uma única emissão de markdown, cacheada
+    st.markdown(_render_signal_cards(signals_key), unsafe_allow_html=True)
 else:
     st.info("Registre resultados para que as sugestões e seu desempenho apareçam aqui.")
 